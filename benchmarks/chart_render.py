@@ -0,0 +1,48 @@
+"""Time trend chart and sparkline rendering
+
+Run from the repository root with `python -m benchmarks.chart_render`.
+"""
+
+import os
+import tempfile
+import timeit
+from datetime import datetime, timedelta
+
+from dexcom_menubar.chart import ChartRenderer, sparkline
+
+
+def benchmark(iterations: int = 200):
+    """Print render cost for cold, unchanged and new-reading cycles"""
+    now = datetime.now()
+    readings = [
+        {'timestamp': now - timedelta(minutes=5 * i), 'value': 120 + (i * 17) % 140}
+        for i in range(13)
+    ]
+
+    with tempfile.TemporaryDirectory() as directory:
+        renderer = ChartRenderer(os.path.join(directory, "chart.png"))
+        window = readings[:12]
+
+        cold = timeit.timeit(lambda: ChartRenderer(renderer.path).render(window), number=20) / 20
+        renderer.render(window)
+        cached = timeit.timeit(lambda: renderer.render(window), number=iterations) / iterations
+
+        windows = [readings[:12], readings[1:]]
+        counter = iter(range(iterations))
+        new = timeit.timeit(lambda: renderer.render(windows[next(counter) % 2]), number=iterations) / iterations
+
+        values = tuple(reading['value'] for reading in window)
+        sparkline.cache_clear()
+        spark_cold = timeit.timeit(lambda: (sparkline.cache_clear(), sparkline(values)), number=iterations) / iterations
+        spark_cached = timeit.timeit(lambda: sparkline(values), number=iterations) / iterations
+
+    print(f"Chart {renderer.pixel_width}x{renderer.pixel_height}px")
+    print(f"  cold render (incl. static layer): {cold * 1000:.2f} ms")
+    print(f"  new reading:                      {new * 1000:.2f} ms")
+    print(f"  unchanged window (cached):        {cached * 1000:.3f} ms")
+    print(f"Sparkline {sparkline(values)}")
+    print(f"  uncached: {spark_cold * 1e6:.1f} us, cached: {spark_cached * 1e6:.1f} us")
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,135 @@
+"""Time region detection against local stand-ins for the two Share servers
+
+Run from the repository root with `python -m benchmarks.region_detection`.
+Each stand-in answers after a fixed delay to simulate the round trip to
+Dexcom; only the OUS one knows the account. Every login runs in a fresh
+interpreter and is timed until that process exits, like `dexcom-setup`,
+so probes left running in the background would show up in the numbers.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import subprocess
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from dexcom_menubar.dexcom_api import DexcomShareAPI, DexcomAuthenticationError
+
+ACCOUNT_ID = "11111111-2222-3333-4444-555555555555"
+SESSION_ID = "aaaaaaaa-bbbb-cccc-dddd-eeeeeeeeeeee"
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class StandInShare(BaseHTTPRequestHandler):
+    """Answers Share login requests after server.delay seconds"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def handle(self):
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client exited without waiting for this response
+            pass
+
+    def do_POST(self):
+        server = self.server
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        time.sleep(server.delay)
+
+        if not self.path.endswith('AuthenticatePublisherAccount'):
+            status, body = 200, SESSION_ID
+        elif server.has_account:
+            status, body = 200, ACCOUNT_ID
+        else:
+            status, body = 500, {"Code": "AccountPasswordInvalid", "Message": "Invalid password"}
+
+        out = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+
+def start_server(has_account: bool, delay: float) -> ThreadingHTTPServer:
+    """Start a stand-in Share server on a free local port"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInShare)
+    server.daemon_threads = True
+    server.has_account = has_account
+    server.delay = delay
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def login(us_url: str, ous_url: str, region: str, fallback: str = None):
+    """Log in once (in the child process), retrying with fallback if the region rejects the account"""
+    DexcomShareAPI.URLS = {'US': us_url, 'OUS': ous_url}
+    try:
+        DexcomShareAPI('user', 'password', None if region == 'auto' else region).authenticate()
+    except DexcomAuthenticationError:
+        if not fallback:
+            raise
+        DexcomShareAPI('user', 'password', fallback).authenticate()
+
+
+def time_process(*args: str) -> float:
+    """Seconds from starting a child interpreter until it exits"""
+    started = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-m", "benchmarks.region_detection", *args],
+        cwd=REPO_ROOT,
+        check=True
+    )
+    return time.perf_counter() - started
+
+
+def benchmark(delay: float = 0.3):
+    """Print process time for a right guess, a wrong guess and parallel detection"""
+    us = start_server(has_account=False, delay=delay)
+    ous = start_server(has_account=True, delay=delay)
+    urls = [f"http://127.0.0.1:{us.server_port}", f"http://127.0.0.1:{ous.server_port}"]
+
+    try:
+        startup = time_process("--startup")
+        right = time_process("--login", *urls, "OUS")
+        wrong = time_process("--login", *urls, "US", "OUS")
+        detected = time_process("--login", *urls, "auto")
+        us.delay = delay * 10
+        detected_slow = time_process("--login", *urls, "auto")
+    finally:
+        for server in (us, ous):
+            server.shutdown()
+            server.server_close()
+
+    print(f"Share login, {delay * 1000:.0f} ms per request (account in OUS), until process exit")
+    print(f"  interpreter startup only:      {startup:.2f} s")
+    print(f"  right region guessed:          {right:.2f} s")
+    print(f"  wrong region, then retry:      {wrong:.2f} s")
+    print(f"  parallel detection:            {detected:.2f} s")
+    print(f"  parallel, US answering slowly: {detected_slow:.2f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time Dexcom Share region detection")
+    parser.add_argument("--startup", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--login", nargs="+", metavar="ARG", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.startup:
+        return
+    if args.login:
+        login(*args.login)
+        return
+    benchmark()
+
+
+if __name__ == '__main__':
+    main()
@@ -8,6 +8,11 @@ from typing import Optional
 
 from dexcom_menubar.dexcom_api import DexcomShareAPI, DexcomAPIError, DexcomAuthenticationError
 from dexcom_menubar.credentials import CredentialManager
+from dexcom_menubar.storage import ReadingStore
+from dexcom_menubar.nightscout import NightscoutUploader
+from dexcom_menubar.gaps import GapDetector
+from dexcom_menubar.chart import ChartRenderer, sparkline
+from dexcom_menubar.pipeline import Pipeline, Cycle, build_pipeline
 
 # Configure logging
 logging.basicConfig(
@@ -33,8 +38,16 @@ class DexcomMenubarApp(rumps.App):
         )
 
         self.api: Optional[DexcomShareAPI] = None
+        self.pipeline: Optional[Pipeline] = None
+        self.cached_login = None  # (region, account_id) stored with the credentials
         self.current_reading = None
         self.recent_readings = []
+        self.reading_items = []  # (menu item, reading) rows in the recent readings list
+        self.store = ReadingStore()
+        self.uploader: Optional[NightscoutUploader] = NightscoutUploader.from_env()
+        self.gap_detector = GapDetector(self.store)
+        self.gap_stats = None
+        self.chart = ChartRenderer()
         self.update_interval = 300  # 5 minutes in seconds
         self.last_notification_time = None  # Track when we last sent a notification
         self.last_notification_condition = None  # Track what condition triggered last notification
@@ -58,6 +71,8 @@ class DexcomMenubarApp(rumps.App):
         if self.api:
             self.timer = rumps.Timer(self.update_glucose, self.update_interval)
             self.timer.start()
+            # Catch up on readings missed while the Mac was asleep
+            rumps.events.on_wake.register(self.on_wake)
             # Initial update
             self.update_glucose(None)
         else:
@@ -66,6 +81,8 @@ class DexcomMenubarApp(rumps.App):
     def initialize_api(self) -> bool:
         """Initialize Dexcom API with stored credentials"""
         try:
+            # Setup runs in a separate process, so re-read what it saved to the keychain
+            CredentialManager.clear_cache()
             username, password, region = CredentialManager.get_credentials()
 
             if not username or not password:
@@ -76,10 +93,21 @@ class DexcomMenubarApp(rumps.App):
                     ok="OK"
                 )
                 self.prompt_for_credentials()
+                CredentialManager.clear_cache()
                 username, password, region = CredentialManager.get_credentials()
 
             if username and password:
-                self.api = DexcomShareAPI(username, password, region)
+                account_id = CredentialManager.get_account_id()
+                self.cached_login = (region, account_id)
+                self.api = DexcomShareAPI(username, password, region, account_id=account_id)
+                self.pipeline = build_pipeline(
+                    self.api,
+                    self.store,
+                    self.gap_detector,
+                    self.uploader,
+                    alert=self.alert_stage,
+                    render=self.render_stage
+                )
                 logger.info("Dexcom API initialized")
                 return True
             else:
@@ -103,24 +131,17 @@ class DexcomMenubarApp(rumps.App):
 
         try:
             logger.info("Fetching glucose reading...")
-            reading = self.api.get_current_glucose()
-
-            if reading:
-                self.current_reading = reading
-                logger.info(f"Updated glucose: {reading['value']} {reading['trend_arrow']}")
-
-                # Check if we need to send a notification
-                self.check_and_notify(reading)
+            cycle = self.pipeline.run()
+            self.save_login_details()
 
-                # Get recent readings for the dropdown
-                self.recent_readings = self.api.get_glucose_readings(max_count=12)
-
-                # Update menu first, then update the title
-                self.update_recent_readings_menu()
-                self.update_menubar_title(reading)
-            else:
-                logger.warning("No glucose reading available")
+            if not cycle.raw:
                 self.title = "⚠ No Data"
+                self.refresh_reading_ages()
+            elif cycle.stopped_at and self.current_reading:
+                # Nothing new arrived, only refresh the title (clears earlier errors) and ages
+                logger.info(f"No new readings (stopped at {cycle.stopped_at} stage)")
+                self.refresh_reading_ages()
+                self.update_menubar_title(self.current_reading)
 
         except DexcomAuthenticationError as e:
             logger.error(f"Authentication error: {e}")
@@ -137,6 +158,37 @@ class DexcomMenubarApp(rumps.App):
             logger.error(f"Unexpected error: {e}")
             self.title = "⚠ Error"
 
+    def alert_stage(self, cycle: Cycle):
+        """Pipeline stage: notify about the newest reading if it just arrived"""
+        reading = cycle.latest
+        if reading and cycle.new and cycle.new[0] is reading:
+            self.check_and_notify(reading)
+
+    def render_stage(self, cycle: Cycle):
+        """Pipeline stage: update the menu and title with the new window"""
+        reading = cycle.latest
+        self.current_reading = reading
+        self.recent_readings = cycle.window
+        if cycle.gap_stats:
+            self.gap_stats = cycle.gap_stats
+        logger.info(f"Updated glucose: {reading['value']} {reading['trend_arrow']}")
+
+        # Update menu first, then update the title
+        self.update_recent_readings_menu()
+        self.update_menubar_title(reading)
+
+    def on_wake(self):
+        """Refresh (and backfill) as soon as the Mac wakes from sleep"""
+        logger.info("System woke from sleep, refreshing")
+        self.update_glucose(None)
+
+    def save_login_details(self):
+        """Cache the detected region and account ID with the credentials so later logins skip the lookups"""
+        login = (self.api.region, self.api.account_id)
+        if self.api.account_id and login != self.cached_login:
+            CredentialManager.update_profile(region=self.api.region, account_id=self.api.account_id)
+            self.cached_login = login
+
     def check_and_notify(self, reading):
         """Check if we should send a notification based on glucose trend"""
         value = reading['value']
@@ -205,19 +257,24 @@ class DexcomMenubarApp(rumps.App):
         trend_arrow = reading['trend_arrow']
         color_indicator = self.get_glucose_color_indicator(value)
 
-        # Show color indicator, value, and trend arrow in menubar
-        self.title = f"{color_indicator} {value} {trend_arrow}"
+        # Show color indicator, value, trend arrow and recent trend sparkline in menubar
+        spark = sparkline(tuple(r['value'] for r in reversed(self.recent_readings[:12])))
+        self.title = f"{color_indicator} {value} {trend_arrow} {spark}".rstrip()
 
         # Update the "Current Reading" menu item
         timestamp = reading['timestamp']
         time_ago = self.get_time_ago(timestamp)
         range_name = self.get_glucose_range_name(value)
 
-        self.menu["Current Reading"].title = (
+        title = (
             f"Current: {color_indicator} {value} mg/dL {trend_arrow}\n"
             f"Status: {range_name}\n"
             f"Updated: {time_ago}"
         )
+        if self.gap_stats:
+            title += f"\nHistory (24h): {self.gap_stats['completeness']:.0%} complete"
+
+        self.menu["Current Reading"].title = title
 
     @staticmethod
     def get_glucose_color_indicator(value: int) -> str:
@@ -260,17 +317,23 @@ class DexcomMenubarApp(rumps.App):
             new_items.append(rumps.MenuItem("Recent Readings", callback=None))
             new_items.append(rumps.separator)
 
+            # Trend chart, only re-rendered when a new reading arrives
+            chart_path = self.chart.render(self.recent_readings[:12])
+            if chart_path:
+                new_items.append(rumps.MenuItem(
+                    "Last Hour",
+                    callback=None,
+                    icon=chart_path,
+                    dimensions=[self.chart.width, self.chart.height],
+                    template=False
+                ))
+
             # Add recent readings
+            reading_items = []
             for reading in self.recent_readings[:12]:
-                value = reading['value']
-                trend_arrow = reading['trend_arrow']
-                timestamp = reading['timestamp']
-                time_str = timestamp.strftime('%H:%M')
-                time_ago = self.get_time_ago(timestamp)
-                color_indicator = self.get_glucose_color_indicator(value)
-
-                title = f"{time_str} - {color_indicator} {value} mg/dL {trend_arrow} ({time_ago})"
-                new_items.append(rumps.MenuItem(title, callback=None))
+                item = rumps.MenuItem(self.format_reading_row(reading), callback=None)
+                reading_items.append((item, reading))
+                new_items.append(item)
 
             # Add static items at the end
             new_items.append(rumps.separator)
@@ -283,10 +346,27 @@ class DexcomMenubarApp(rumps.App):
             self.menu.clear()
             for item in new_items:
                 self.menu.add(item)
+            self.reading_items = reading_items
 
         except Exception as e:
             logger.error(f"Error updating recent readings menu: {e}", exc_info=True)
 
+    def format_reading_row(self, reading) -> str:
+        """Menu title for a reading in the recent readings list"""
+        value = reading['value']
+        trend_arrow = reading['trend_arrow']
+        timestamp = reading['timestamp']
+        time_str = timestamp.strftime('%H:%M')
+        time_ago = self.get_time_ago(timestamp)
+        color_indicator = self.get_glucose_color_indicator(value)
+
+        return f"{time_str} - {color_indicator} {value} mg/dL {trend_arrow} ({time_ago})"
+
+    def refresh_reading_ages(self):
+        """Update the "(Nm ago)" labels of the recent readings without rebuilding the menu"""
+        for item, reading in self.reading_items:
+            item.title = self.format_reading_row(reading)
+
     @staticmethod
     def get_time_ago(timestamp) -> str:
         """Get human-readable time ago string"""
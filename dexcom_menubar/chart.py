@@ -0,0 +1,260 @@
+"""Sparkline and trend chart rendering for the recent readings window"""
+
+import os
+import zlib
+import struct
+import logging
+from datetime import timedelta
+from functools import lru_cache
+from typing import Optional, List, Dict, Any, Tuple
+
+from dexcom_menubar.storage import APP_SUPPORT_DIR, to_ms
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHART_PATH = os.path.join(APP_SUPPORT_DIR, "chart.png")
+
+SPARK_BLOCKS = "▁▂▃▄▅▆▇█"
+
+# Glucose range shown on the chart (mg/dL), values outside are clipped
+CHART_MIN = 40
+CHART_MAX = 350
+
+# Range boundaries drawn as bands, matching the menubar color indicators
+THRESHOLDS = (70, 180, 250)
+
+# RGBA colors
+BAND_COLORS = (
+    (255, 59, 48, 56),    # Low
+    (52, 199, 89, 40),    # In range
+    (255, 149, 0, 40),    # High
+    (255, 204, 0, 48),    # Very high
+)
+POINT_COLORS = (
+    (255, 59, 48, 255),
+    (52, 199, 89, 255),
+    (255, 149, 0, 255),
+    (255, 204, 0, 255),
+)
+THRESHOLD_COLOR = (142, 142, 147, 160)
+AXIS_COLOR = (99, 99, 102, 255)
+LINE_COLOR = (142, 142, 147, 255)
+
+# Spacing of the time ticks on the x axis, counted back from the newest reading
+TICK_INTERVAL = timedelta(minutes=15)
+
+
+@lru_cache(maxsize=32)
+def sparkline(values: Tuple[int, ...]) -> str:
+    """
+    Render glucose values (oldest first) as a Unicode sparkline
+
+    Cached on the values, so redrawing an unchanged window is free.
+    """
+    if not values:
+        return ""
+
+    low, high = min(values), max(values)
+    if high == low:
+        return SPARK_BLOCKS[len(SPARK_BLOCKS) // 2] * len(values)
+
+    steps = len(SPARK_BLOCKS) - 1
+    return "".join(SPARK_BLOCKS[round((value - low) * steps / (high - low))] for value in values)
+
+
+def range_index(value: int) -> int:
+    """Index of the glucose range a value falls in (0=low ... 3=very high)"""
+    if value < 70:
+        return 0
+    elif value <= 180:
+        return 1
+    elif value <= 250:
+        return 2
+    else:
+        return 3
+
+
+class ChartRenderer:
+    """
+    Render the recent readings window as a PNG trend chart
+
+    The background (range bands, threshold lines, axes and time ticks) is
+    rendered once and reused. The chart itself is cached by the window contents, so it is only
+    redrawn when a new reading arrives.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CHART_PATH,
+        width: int = 240,
+        height: int = 80,
+        scale: int = 2,
+        window: timedelta = timedelta(hours=1)
+    ):
+        """
+        Args:
+            path: Where to write the PNG
+            width: Chart width in points
+            height: Chart height in points
+            scale: Pixels per point (2 for Retina displays)
+            window: Time span shown, ending at the newest reading
+        """
+        self.path = path
+        self.width = width
+        self.height = height
+        self.scale = scale
+        self.window_ms = int(window.total_seconds() * 1000)
+        self.tick_ms = int(TICK_INTERVAL.total_seconds() * 1000)
+
+        self.pixel_width = width * scale
+        self.pixel_height = height * scale
+        self.margin = 4 * scale
+
+        self._background: Optional[bytes] = None
+        self._key: Optional[Tuple[Tuple[int, int], ...]] = None
+
+    def _y(self, value: int) -> int:
+        """Pixel row for a glucose value"""
+        value = min(max(value, CHART_MIN), CHART_MAX)
+        usable = self.pixel_height - 2 * self.margin
+        return self.margin + round((CHART_MAX - value) * (usable - 1) / (CHART_MAX - CHART_MIN))
+
+    def _x(self, timestamp_ms: int, newest_ms: int) -> int:
+        """Pixel column for a timestamp"""
+        usable = self.pixel_width - 2 * self.margin
+        offset = min(max(newest_ms - timestamp_ms, 0), self.window_ms)
+        return self.margin + round((self.window_ms - offset) * (usable - 1) / self.window_ms)
+
+    def background(self) -> bytes:
+        """Static layer with range bands, threshold lines, axes and time ticks, rendered once"""
+        if self._background is None:
+            band_rows = [bytes(color) * self.pixel_width for color in BAND_COLORS]
+            threshold_row = bytes(THRESHOLD_COLOR) * self.pixel_width
+            threshold_ys = {self._y(threshold) for threshold in THRESHOLDS}
+
+            rows = []
+            for y in range(self.pixel_height):
+                if y in threshold_ys:
+                    rows.append(threshold_row)
+                    continue
+                # Value at this row (top is high)
+                usable = self.pixel_height - 2 * self.margin
+                value = CHART_MAX - (y - self.margin) * (CHART_MAX - CHART_MIN) / (usable - 1)
+                rows.append(band_rows[range_index(value)])
+
+            pixels = bytearray(b"".join(rows))
+            self._axes(pixels)
+            self._background = bytes(pixels)
+        return self._background
+
+    def _axes(self, pixels: bytearray):
+        """Draw the axes, with a tick every TICK_INTERVAL back from the newest reading"""
+        color = bytes(AXIS_COLOR)
+        left, right = self._x(0, self.window_ms), self._x(0, 0)
+        top, bottom = self._y(CHART_MAX), self._y(CHART_MIN)
+
+        self._line(pixels, left, top, left, bottom, color)
+        self._line(pixels, left, bottom, right, bottom, color)
+
+        tick_length = 2 * self.scale
+        for offset_ms in range(0, self.window_ms + 1, self.tick_ms):
+            x = self._x(0, offset_ms)
+            self._line(pixels, x, bottom - tick_length, x, bottom, color)
+
+    def _plot(self, pixels: bytearray, x: int, y: int, color: bytes, radius: int):
+        """Fill a square of pixels around (x, y)"""
+        stride = self.pixel_width * 4
+        x0 = max(x - radius, 0)
+        x1 = min(x + radius, self.pixel_width - 1)
+        span = color * (x1 - x0 + 1)
+        for row in range(max(y - radius, 0), min(y + radius, self.pixel_height - 1) + 1):
+            start = row * stride + x0 * 4
+            pixels[start:start + len(span)] = span
+
+    def _line(self, pixels: bytearray, x0: int, y0: int, x1: int, y1: int, color: bytes):
+        """Draw a line between two points"""
+        steps = max(abs(x1 - x0), abs(y1 - y0), 1)
+        radius = self.scale // 2
+        for i in range(steps + 1):
+            self._plot(pixels, x0 + (x1 - x0) * i // steps, y0 + (y1 - y0) * i // steps, color, radius)
+
+    def _encode_png(self, pixels: bytes) -> bytes:
+        """Encode RGBA pixels as a PNG"""
+        stride = self.pixel_width * 4
+        raw = b"".join(
+            b"\x00" + pixels[row * stride:(row + 1) * stride]
+            for row in range(self.pixel_height)
+        )
+
+        def chunk(tag: bytes, data: bytes) -> bytes:
+            return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+        header = struct.pack(">IIBBBBB", self.pixel_width, self.pixel_height, 8, 6, 0, 0, 0)
+        return (
+            b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(raw, 6))
+            + chunk(b"IEND", b"")
+        )
+
+    def draw(self, points: List[Tuple[int, int]]) -> bytes:
+        """
+        Draw readings on the static layer
+
+        Args:
+            points: (timestamp_ms, value) tuples
+
+        Returns:
+            PNG image data
+        """
+        pixels = bytearray(self.background())
+        if not points:
+            return self._encode_png(bytes(pixels))
+
+        points = sorted(points)
+        newest_ms = points[-1][0]
+        visible = [(ms, value) for ms, value in points if newest_ms - ms <= self.window_ms]
+        coords = [(self._x(ms, newest_ms), self._y(value), value) for ms, value in visible]
+
+        line_color = bytes(LINE_COLOR)
+        for (x0, y0, _), (x1, y1, _) in zip(coords, coords[1:]):
+            self._line(pixels, x0, y0, x1, y1, line_color)
+
+        for x, y, value in coords:
+            self._plot(pixels, x, y, bytes(POINT_COLORS[range_index(value)]), 2 * self.scale)
+
+        return self._encode_png(bytes(pixels))
+
+    def render(self, readings: List[Dict[str, Any]]) -> Optional[str]:
+        """
+        Write the chart for a window of readings, unless it is unchanged
+
+        Args:
+            readings: Parsed readings (any order)
+
+        Returns:
+            Path to the PNG, or None if rendering failed
+        """
+        key = tuple(sorted(
+            (reading.get('timestamp_ms') or to_ms(reading['timestamp']), reading['value'])
+            for reading in readings
+        ))
+        if key == self._key and os.path.exists(self.path):
+            return self.path
+
+        try:
+            data = self.draw(list(key))
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Failed to render chart: {e}")
+            return None
+
+        self._key = key
+        return self.path
+
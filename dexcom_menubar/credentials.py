@@ -1,20 +1,109 @@
 """Credential management for Dexcom Share"""
 
 import keyring
+import json
 import os
 import logging
-from typing import Optional, Tuple
+from typing import Optional, Tuple, Dict, Any, List
 
 logger = logging.getLogger(__name__)
 
 SERVICE_NAME = "DexcomMenubar"
+DEFAULT_PROFILE = "default"
+
+# Keychain entry listing the names of all saved profiles
+PROFILES_KEY = "profiles"
+
+# Per-field entries written by earlier versions, migrated into the default profile
+LEGACY_KEYS = ("username", "password", "region")
 
 
 class CredentialManager:
-    """Manage Dexcom Share credentials securely"""
+    """
+    Manage Dexcom Share credentials securely
+
+    Each profile is stored as a single JSON keychain entry holding the
+    username, password, region and cached account ID, so loading a profile
+    costs one keychain round trip. Lookups are memoized in-process and the
+    cache is invalidated whenever a profile is saved or deleted.
+    """
+
+    # profile name -> profile dict (None if the profile does not exist)
+    _cache: Dict[str, Optional[Dict[str, Any]]] = {}
 
     @staticmethod
-    def get_credentials() -> Tuple[Optional[str], Optional[str], str]:
+    def get_active_profile() -> str:
+        """Get the name of the profile to use (DEXCOM_PROFILE or 'default')"""
+        return os.environ.get('DEXCOM_PROFILE') or DEFAULT_PROFILE
+
+    @staticmethod
+    def _entry_name(profile: str) -> str:
+        """Keychain account name for a profile entry"""
+        return f"profile:{profile}"
+
+    @classmethod
+    def load_profile(cls, profile: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Load a profile from the keychain, using the in-process cache if possible
+
+        Args:
+            profile: Profile name (defaults to the active profile)
+
+        Returns:
+            Dictionary with username, password, region and account_id,
+            or None if the profile does not exist
+        """
+        profile = profile or cls.get_active_profile()
+
+        if profile in cls._cache:
+            return cls._cache[profile]
+
+        try:
+            raw = keyring.get_password(SERVICE_NAME, cls._entry_name(profile))
+            if raw:
+                data = json.loads(raw)
+            elif profile == DEFAULT_PROFILE:
+                data = cls._migrate_legacy_credentials()
+            else:
+                data = None
+        except Exception as e:
+            # Don't cache failures, the keychain may be unlocked later
+            logger.warning(f"Failed to retrieve credentials from keychain: {e}")
+            return None
+
+        cls._cache[profile] = data
+        return data
+
+    @classmethod
+    def _migrate_legacy_credentials(cls) -> Optional[Dict[str, Any]]:
+        """Move per-field credentials from older versions into the default profile"""
+        username = keyring.get_password(SERVICE_NAME, "username")
+        password = keyring.get_password(SERVICE_NAME, "password")
+
+        if not username or not password:
+            return None
+
+        region = keyring.get_password(SERVICE_NAME, "region") or 'US'
+        data = {
+            "username": username,
+            "password": password,
+            "region": region,
+            "account_id": None
+        }
+
+        keyring.set_password(SERVICE_NAME, cls._entry_name(DEFAULT_PROFILE), json.dumps(data))
+        cls._add_to_index(DEFAULT_PROFILE)
+        for key in LEGACY_KEYS:
+            try:
+                keyring.delete_password(SERVICE_NAME, key)
+            except Exception:
+                pass
+
+        logger.info("Migrated legacy keychain credentials to the default profile")
+        return data
+
+    @classmethod
+    def get_credentials(cls, profile: Optional[str] = None) -> Tuple[Optional[str], Optional[str], Optional[str]]:
         """
         Get Dexcom Share credentials
 
@@ -22,75 +111,168 @@ class CredentialManager:
         1. Environment variables
         2. macOS Keychain
 
+        Args:
+            profile: Profile name (defaults to the active profile)
+
         Returns:
-            Tuple of (username, password, region)
+            Tuple of (username, password, region); region is None when it
+            should be detected automatically
         """
         # Try environment variables first
         username = os.environ.get('DEXCOM_USERNAME')
         password = os.environ.get('DEXCOM_PASSWORD')
-        region = os.environ.get('DEXCOM_REGION', 'US')
+        region = os.environ.get('DEXCOM_REGION') or None
 
         if username and password:
             logger.info("Using credentials from environment variables")
             return username, password, region
 
         # Try keychain
-        try:
-            username = keyring.get_password(SERVICE_NAME, "username")
-            password = keyring.get_password(SERVICE_NAME, "password")
-            region = keyring.get_password(SERVICE_NAME, "region") or 'US'
-
-            if username and password:
-                logger.info("Using credentials from keychain")
-                return username, password, region
-        except Exception as e:
-            logger.warning(f"Failed to retrieve credentials from keychain: {e}")
+        data = cls.load_profile(profile)
+        if data and data.get("username") and data.get("password"):
+            logger.info("Using credentials from keychain")
+            return data["username"], data["password"], data.get("region")
 
         return None, None, region
 
-    @staticmethod
-    def save_credentials(username: str, password: str, region: str = 'US') -> bool:
+    @classmethod
+    def get_account_id(cls, profile: Optional[str] = None) -> Optional[str]:
+        """Get the cached Dexcom account ID for a profile, if known"""
+        if os.environ.get('DEXCOM_USERNAME') and os.environ.get('DEXCOM_PASSWORD'):
+            return None
+
+        data = cls.load_profile(profile)
+        return data.get("account_id") if data else None
+
+    @classmethod
+    def save_credentials(
+        cls,
+        username: str,
+        password: str,
+        region: Optional[str] = None,
+        profile: Optional[str] = None,
+        account_id: Optional[str] = None
+    ) -> bool:
         """
         Save credentials to macOS Keychain
 
         Args:
             username: Dexcom Share username
             password: Dexcom Share password
-            region: Region ('US' or 'OUS')
+            region: Region ('US' or 'OUS'), or None to detect it on login
+            profile: Profile name (defaults to the active profile)
+            account_id: Dexcom account ID, if already known
 
         Returns:
             True if successful
         """
+        profile = profile or cls.get_active_profile()
+        data = {
+            "username": username,
+            "password": password,
+            "region": region,
+            "account_id": account_id
+        }
+
         try:
-            keyring.set_password(SERVICE_NAME, "username", username)
-            keyring.set_password(SERVICE_NAME, "password", password)
-            keyring.set_password(SERVICE_NAME, "region", region)
-            logger.info("Credentials saved to keychain")
+            keyring.set_password(SERVICE_NAME, cls._entry_name(profile), json.dumps(data))
+            cls._add_to_index(profile)
+            cls._cache[profile] = data
+            logger.info(f"Credentials saved to keychain (profile '{profile}')")
             return True
         except Exception as e:
+            cls._cache.pop(profile, None)
             logger.error(f"Failed to save credentials to keychain: {e}")
             return False
 
-    @staticmethod
-    def delete_credentials() -> bool:
+    @classmethod
+    def update_profile(cls, profile: Optional[str] = None, **fields: Any) -> bool:
+        """
+        Update fields of an existing profile (e.g. the cached account ID or detected region)
+
+        Does nothing when the credentials come from environment variables
+        or the profile does not exist.
+
+        Returns:
+            True if the profile was written
+        """
+        if os.environ.get('DEXCOM_USERNAME') and os.environ.get('DEXCOM_PASSWORD'):
+            return False
+
+        profile = profile or cls.get_active_profile()
+        data = cls.load_profile(profile)
+        if not data:
+            return False
+
+        updated = dict(data, **fields)
+        if updated == data:
+            return False
+
+        return cls.save_credentials(
+            updated["username"],
+            updated["password"],
+            updated.get("region"),
+            profile=profile,
+            account_id=updated.get("account_id")
+        )
+
+    @classmethod
+    def delete_credentials(cls, profile: Optional[str] = None) -> bool:
         """
         Delete credentials from keychain
 
+        Args:
+            profile: Profile name (defaults to the active profile)
+
         Returns:
             True if successful
         """
+        profile = profile or cls.get_active_profile()
+
         try:
-            keyring.delete_password(SERVICE_NAME, "username")
-            keyring.delete_password(SERVICE_NAME, "password")
-            keyring.delete_password(SERVICE_NAME, "region")
-            logger.info("Credentials deleted from keychain")
+            keyring.delete_password(SERVICE_NAME, cls._entry_name(profile))
+            cls._remove_from_index(profile)
+            logger.info(f"Credentials deleted from keychain (profile '{profile}')")
             return True
         except Exception as e:
             logger.error(f"Failed to delete credentials from keychain: {e}")
             return False
+        finally:
+            cls._cache.pop(profile, None)
 
     @staticmethod
-    def has_credentials() -> bool:
+    def list_profiles() -> List[str]:
+        """List the names of all saved profiles"""
+        try:
+            raw = keyring.get_password(SERVICE_NAME, PROFILES_KEY)
+            return json.loads(raw) if raw else []
+        except Exception as e:
+            logger.warning(f"Failed to list profiles from keychain: {e}")
+            return []
+
+    @classmethod
+    def _add_to_index(cls, profile: str):
+        """Record a profile name in the profile index"""
+        profiles = cls.list_profiles()
+        if profile not in profiles:
+            profiles.append(profile)
+            keyring.set_password(SERVICE_NAME, PROFILES_KEY, json.dumps(profiles))
+
+    @classmethod
+    def _remove_from_index(cls, profile: str):
+        """Remove a profile name from the profile index"""
+        profiles = cls.list_profiles()
+        if profile in profiles:
+            profiles.remove(profile)
+            keyring.set_password(SERVICE_NAME, PROFILES_KEY, json.dumps(profiles))
+
+    @classmethod
+    def has_credentials(cls, profile: Optional[str] = None) -> bool:
         """Check if credentials are available"""
-        username, password, _ = CredentialManager.get_credentials()
+        username, password, _ = cls.get_credentials(profile)
         return username is not None and password is not None
+
+    @classmethod
+    def clear_cache(cls):
+        """Forget all memoized profiles"""
+        cls._cache.clear()
@@ -2,11 +2,25 @@
 
 import requests
 import logging
+import queue
+import threading
+import time
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Returned by Share instead of an error for unknown accounts
+NULL_ACCOUNT_ID = "00000000-0000-0000-0000-000000000000"
+
+# Share error codes meaning a server doesn't accept the credentials
+# (as opposed to an outage); the wrong region answers with one of these
+REJECTION_CODES = {
+    "AccountPasswordInvalid",
+    "SSO_AuthenticateAccountNotFound",
+    "SSO_AuthenticatePasswordInvalid",
+}
+
 
 class DexcomAPIError(Exception):
     """Base exception for Dexcom API errors"""
@@ -54,28 +68,122 @@ class DexcomShareAPI:
         9: 'RateOutOfRange'
     }
 
-    def __init__(self, username: str, password: str, region: str = 'US'):
+    # Application ID - this is the official Dexcom Share app ID
+    APPLICATION_ID = "d89443d2-327c-4a6f-89e5-496bbb0317db"
+
+    HEADERS = {
+        "Content-Type": "application/json",
+        "User-Agent": "Dexcom Share/3.0.2.11 CFNetwork/711.2.23 Darwin/14.0.0"
+    }
+
+    def __init__(
+        self,
+        username: str,
+        password: str,
+        region: Optional[str] = 'US',
+        account_id: Optional[str] = None
+    ):
         """
         Initialize Dexcom Share API client
 
         Args:
             username: Dexcom Share username
             password: Dexcom Share password
-            region: Region ('US' or 'OUS' for Outside US)
+            region: Region ('US' or 'OUS' for Outside US), or None to detect it
+            account_id: Cached account ID, skips the account lookup on login
         """
         self.username = username
         self.password = password
-        self.region = region.upper()
+        self.region = region.upper() if region else None
 
-        if self.region not in self.URLS:
+        if self.region is not None and self.region not in self.URLS:
             raise ValueError(f"Invalid region: {region}. Must be 'US' or 'OUS'")
 
-        self.base_url = self.URLS[self.region]
+        self.base_url = self.URLS[self.region] if self.region else None
         self.session_id: Optional[str] = None
-        self.account_id: Optional[str] = None
+        self.account_id: Optional[str] = account_id if self.region else None
+
+        self.application_id = self.APPLICATION_ID
+
+    @classmethod
+    def detect_region(cls, username: str, password: str, timeout: float = 5.0) -> Tuple[str, str]:
+        """
+        Find the region an account belongs to by probing all regions at once
+
+        Each region's AuthenticatePublisherAccount endpoint is called on its
+        own daemon thread; the first one to return a valid account ID wins.
+        The slower probes are left running in the background and can't delay
+        the caller or interpreter exit.
+
+        Args:
+            username: Dexcom Share username
+            password: Dexcom Share password
+            timeout: Deadline in seconds for the whole detection
+
+        Returns:
+            Tuple of (region, account_id)
 
-        # Application ID - this is the official Dexcom Share app ID
-        self.application_id = "d89443d2-327c-4a6f-89e5-496bbb0317db"
+        Raises:
+            DexcomAuthenticationError: If every region rejects the credentials
+            DexcomAPIError: If any region could not be reached or answered
+                with an unexpected error
+        """
+        payload = {
+            "accountName": username,
+            "password": password,
+            "applicationId": cls.APPLICATION_ID
+        }
+        results: "queue.Queue[Tuple[str, Any]]" = queue.Queue()
+
+        def probe(region: str):
+            try:
+                results.put((region, requests.post(
+                    f"{cls.URLS[region]}/General/AuthenticatePublisherAccount",
+                    json=payload,
+                    headers=cls.HEADERS,
+                    timeout=timeout
+                )))
+            except requests.exceptions.RequestException as e:
+                results.put((region, e))
+
+        logger.info("Detecting Dexcom Share region...")
+        for region in cls.URLS:
+            threading.Thread(target=probe, args=(region,), name=f"region-probe-{region}", daemon=True).start()
+
+        deadline = time.monotonic() + timeout
+        rejected = []
+        errors = []
+
+        for _ in cls.URLS:
+            try:
+                region, response = results.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                errors.append(f"no response within {timeout:g}s")
+                break
+
+            if isinstance(response, Exception):
+                errors.append(f"{region}: {response}")
+                continue
+
+            try:
+                body = response.json()
+            except ValueError:
+                body = None
+
+            if response.status_code == 200 and body and isinstance(body, str):
+                if body != NULL_ACCOUNT_ID:
+                    logger.info(f"Detected region: {region}")
+                    return region, body
+                rejected.append(region)
+            elif isinstance(body, dict) and body.get("Code") in REJECTION_CODES:
+                rejected.append(region)
+            else:
+                # Outages and other errors say nothing about the credentials
+                errors.append(f"{region}: {response.status_code} - {response.text[:200]}")
+
+        if len(rejected) == len(cls.URLS):
+            raise DexcomAuthenticationError("Invalid credentials for all regions")
+        raise DexcomAPIError(f"Region detection failed: {'; '.join(errors)}")
 
     def authenticate(self) -> bool:
         """
@@ -87,7 +195,23 @@ class DexcomShareAPI:
         Raises:
             DexcomAuthenticationError: If authentication fails
         """
+        headers = self.HEADERS
+
         try:
+            # Without a configured region, the detection also yields the account ID
+            if not self.region:
+                self.region, self.account_id = self.detect_region(self.username, self.password)
+                self.base_url = self.URLS[self.region]
+
+            # With a cached account ID we can log in directly
+            if self.account_id:
+                logger.info("Logging in with cached account ID...")
+                if self._login(headers):
+                    logger.info("Successfully authenticated with Dexcom Share API")
+                    return True
+                logger.info("Cached account ID rejected, doing full authentication")
+                self.account_id = None
+
             # First, get account ID
             auth_url = f"{self.base_url}/General/AuthenticatePublisherAccount"
 
@@ -97,11 +221,6 @@ class DexcomShareAPI:
                 "applicationId": self.application_id
             }
 
-            headers = {
-                "Content-Type": "application/json",
-                "User-Agent": "Dexcom Share/3.0.2.11 CFNetwork/711.2.23 Darwin/14.0.0"
-            }
-
             logger.info("Authenticating with Dexcom Share API...")
             response = requests.post(auth_url, json=payload, headers=headers)
 
@@ -112,28 +231,11 @@ class DexcomShareAPI:
 
             self.account_id = response.json()
 
-            if not self.account_id or self.account_id == "00000000-0000-0000-0000-000000000000":
+            if not self.account_id or self.account_id == NULL_ACCOUNT_ID:
                 raise DexcomAuthenticationError("Invalid credentials")
 
             # Now login to get session ID
-            login_url = f"{self.base_url}/General/LoginPublisherAccountById"
-
-            payload = {
-                "accountId": self.account_id,
-                "password": self.password,
-                "applicationId": self.application_id
-            }
-
-            response = requests.post(login_url, json=payload, headers=headers)
-
-            if response.status_code != 200:
-                raise DexcomAuthenticationError(
-                    f"Login failed: {response.status_code} - {response.text}"
-                )
-
-            self.session_id = response.json()
-
-            if not self.session_id:
+            if not self._login(headers, raise_on_failure=True):
                 raise DexcomAuthenticationError("Failed to obtain session ID")
 
             logger.info("Successfully authenticated with Dexcom Share API")
@@ -142,6 +244,28 @@ class DexcomShareAPI:
         except requests.exceptions.RequestException as e:
             raise DexcomAPIError(f"Network error during authentication: {str(e)}")
 
+    def _login(self, headers: Dict[str, str], raise_on_failure: bool = False) -> bool:
+        """Log in with the known account ID and store the session ID"""
+        login_url = f"{self.base_url}/General/LoginPublisherAccountById"
+
+        payload = {
+            "accountId": self.account_id,
+            "password": self.password,
+            "applicationId": self.application_id
+        }
+
+        response = requests.post(login_url, json=payload, headers=headers)
+
+        if response.status_code != 200:
+            if raise_on_failure:
+                raise DexcomAuthenticationError(
+                    f"Login failed: {response.status_code} - {response.text}"
+                )
+            return False
+
+        self.session_id = response.json()
+        return bool(self.session_id) and self.session_id != NULL_ACCOUNT_ID
+
     def get_current_glucose(self) -> Optional[Dict[str, Any]]:
         """
         Get the most recent glucose reading
@@ -163,6 +287,22 @@ class DexcomShareAPI:
         Returns:
             List of glucose reading dictionaries
 
+        Raises:
+            DexcomAPIError: If API request fails
+        """
+        return [self.parse_reading(reading) for reading in self.get_raw_glucose_readings(max_count, minutes)]
+
+    def get_raw_glucose_readings(self, max_count: int = 12, minutes: int = 1440) -> List[Dict[str, Any]]:
+        """
+        Get unparsed glucose readings from Dexcom Share
+
+        Args:
+            max_count: Maximum number of readings to retrieve (default 12)
+            minutes: Number of minutes to look back (default 1440 = 24 hours)
+
+        Returns:
+            List of raw reading dictionaries as returned by the API
+
         Raises:
             DexcomAPIError: If API request fails
         """
@@ -179,37 +319,25 @@ class DexcomShareAPI:
                 "maxCount": max_count
             }
 
-            headers = {
-                "Content-Type": "application/json",
-                "User-Agent": "Dexcom Share/3.0.2.11 CFNetwork/711.2.23 Darwin/14.0.0"
-            }
-
-            response = requests.post(url, params=params, headers=headers)
+            response = requests.post(url, params=params, headers=self.HEADERS)
 
             if response.status_code == 500:
                 # Session expired, re-authenticate
                 logger.info("Session expired, re-authenticating...")
                 self.authenticate()
-                return self.get_glucose_readings(max_count, minutes)
+                return self.get_raw_glucose_readings(max_count, minutes)
 
             if response.status_code != 200:
                 raise DexcomAPIError(
                     f"Failed to get glucose readings: {response.status_code} - {response.text}"
                 )
 
-            raw_readings = response.json()
-
-            # Parse and format readings
-            readings = []
-            for reading in raw_readings:
-                readings.append(self._parse_reading(reading))
-
-            return readings
+            return response.json()
 
         except requests.exceptions.RequestException as e:
             raise DexcomAPIError(f"Network error: {str(e)}")
 
-    def _parse_reading(self, raw_reading: Dict[str, Any]) -> Dict[str, Any]:
+    def parse_reading(self, raw_reading: Dict[str, Any]) -> Dict[str, Any]:
         """Parse raw API reading into formatted dictionary"""
         # Convert Dexcom timestamp (milliseconds since epoch)
         # Handle both /Date(...)/ and Date(...) formats
@@ -248,6 +376,7 @@ class DexcomShareAPI:
             'trend_arrow': self.TREND_ARROWS.get(trend, '?'),
             'trend_name': self.TREND_NAMES.get(trend, 'Unknown'),
             'timestamp': timestamp,
+            'timestamp_ms': timestamp_ms,
             'timestamp_str': timestamp.strftime('%Y-%m-%d %H:%M:%S')
         }
 
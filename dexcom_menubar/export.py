@@ -0,0 +1,204 @@
+"""Export stored glucose reading history to CSV, NDJSON or Parquet"""
+
+import os
+import sys
+import csv
+import argparse
+from datetime import datetime
+from typing import Optional, List, Tuple, Iterator, Iterable, TextIO
+
+from dateutil import parser as date_parser
+
+from dexcom_menubar.dexcom_api import DexcomShareAPI
+from dexcom_menubar.storage import ReadingStore, DEFAULT_DB_PATH
+
+FORMATS = ('csv', 'ndjson', 'parquet')
+COLUMNS = ('timestamp', 'timestamp_ms', 'value', 'trend', 'trend_name')
+
+# Every field is a number or a fixed trend name, so formatting a template is
+# equivalent to json.dumps and much cheaper per line
+NDJSON_LINE = (
+    '{{"timestamp": "{}", "timestamp_ms": {}, "value": {}, '
+    '"trend": {}, "trend_name": "{}"}}\n'
+)
+
+Row = Tuple[int, int, int]
+
+
+class ExportError(Exception):
+    """Export could not be completed"""
+    pass
+
+
+def with_progress(batches: Iterable[List[Row]], total: int, stream: TextIO = sys.stderr) -> Iterator[List[Row]]:
+    """Pass batches through unchanged while reporting progress"""
+    done = 0
+    for batch in batches:
+        yield batch
+        done += len(batch)
+        percent = done * 100 // total if total else 100
+        stream.write(f"\rExporting... {done}/{total} readings ({percent}%)")
+        stream.flush()
+    stream.write("\n")
+
+
+def iter_records(batches: Iterable[List[Row]]) -> Iterator[Tuple[str, int, int, int, str]]:
+    """Expand stored rows into export records, one at a time"""
+    trend_names = DexcomShareAPI.TREND_NAMES
+    fromtimestamp = datetime.fromtimestamp
+    for batch in batches:
+        for timestamp_ms, value, trend in batch:
+            yield (
+                fromtimestamp(timestamp_ms / 1000).isoformat(timespec='seconds'),
+                timestamp_ms,
+                value,
+                trend,
+                trend_names.get(trend, 'Unknown')
+            )
+
+
+def write_csv(batches: Iterable[List[Row]], output: TextIO):
+    """Write readings as CSV with a header row"""
+    writer = csv.writer(output)
+    writer.writerow(COLUMNS)
+    writer.writerows(iter_records(batches))
+
+
+def write_ndjson(batches: Iterable[List[Row]], output: TextIO):
+    """Write readings as newline-delimited JSON objects"""
+    output.writelines(NDJSON_LINE.format(*record) for record in iter_records(batches))
+
+
+def write_parquet(batches: Iterable[List[Row]], path: str):
+    """
+    Write readings as a Parquet file, one row group per batch
+
+    Uses the same columns as CSV/NDJSON. The timestamp column is a
+    timezone-aware (UTC) timestamp rather than a local-time string, so
+    readers show it in their own timezone.
+
+    Requires the optional pyarrow dependency.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ExportError("Parquet export requires pyarrow: pip install pyarrow")
+
+    trend_names = DexcomShareAPI.TREND_NAMES
+    schema = pa.schema([
+        ('timestamp', pa.timestamp('ms', tz='UTC')),
+        ('timestamp_ms', pa.int64()),
+        ('value', pa.int16()),
+        ('trend', pa.int8()),
+        ('trend_name', pa.string()),
+    ])
+
+    with pq.ParquetWriter(path, schema) as writer:
+        for batch in batches:
+            timestamps, values, trends = zip(*batch)
+            writer.write_batch(pa.record_batch([
+                pa.array(timestamps, type=pa.timestamp('ms', tz='UTC')),
+                pa.array(timestamps, type=pa.int64()),
+                pa.array(values, type=pa.int16()),
+                pa.array(trends, type=pa.int8()),
+                pa.array([trend_names.get(trend, 'Unknown') for trend in trends], type=pa.string()),
+            ], schema=schema))
+
+
+def export_readings(
+    store: ReadingStore,
+    output: str,
+    fmt: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    progress: bool = True
+) -> int:
+    """
+    Stream readings from the store into an export file
+
+    Args:
+        store: Reading store to export from
+        output: Output file path, or '-' for stdout (CSV/NDJSON only)
+        fmt: One of 'csv', 'ndjson' or 'parquet'
+        start: Earliest timestamp to include (inclusive)
+        end: Latest timestamp to include (exclusive)
+        progress: Report progress on stderr
+
+    Returns:
+        Number of exported readings
+    """
+    if fmt not in FORMATS:
+        raise ExportError(f"Unknown format: {fmt}. Must be one of {', '.join(FORMATS)}")
+
+    total = store.count(start, end)
+    batches = store.iter_batches(start, end)
+    if progress:
+        batches = with_progress(batches, total)
+
+    if fmt == 'parquet':
+        if output == '-':
+            raise ExportError("Parquet export needs an output file")
+        write_parquet(batches, output)
+        return total
+
+    writer = write_csv if fmt == 'csv' else write_ndjson
+    if output == '-':
+        writer(batches, sys.stdout)
+    else:
+        with open(output, 'w', newline='') as f:
+            writer(batches, f)
+
+    return total
+
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Export stored Dexcom glucose readings")
+    parser.add_argument("output", help="Output file ('-' for stdout)")
+    parser.add_argument("--format", choices=FORMATS,
+                        help="Output format (default: inferred from the file extension, else csv)")
+    parser.add_argument("--start", help="Only export readings at or after this date/time")
+    parser.add_argument("--end", help="Only export readings before this date/time")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="Path to the reading database")
+    parser.add_argument("--quiet", action="store_true", help="Don't show progress")
+    return parser.parse_args()
+
+
+def main():
+    """Command line entry point"""
+    args = parse_args()
+
+    fmt = args.format
+    if not fmt:
+        extension = os.path.splitext(args.output)[1].lstrip('.').lower()
+        fmt = {'jsonl': 'ndjson', 'json': 'ndjson'}.get(extension, extension)
+        if fmt not in FORMATS:
+            fmt = 'csv'
+
+    try:
+        start = date_parser.parse(args.start) if args.start else None
+        end = date_parser.parse(args.end) if args.end else None
+    except (ValueError, OverflowError) as e:
+        print(f"Error: Invalid date: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if not os.path.exists(args.db):
+        print(f"Error: No reading history found at {args.db}", file=sys.stderr)
+        sys.exit(1)
+
+    store = ReadingStore(args.db)
+    try:
+        count = export_readings(store, args.output, fmt, start, end, progress=not args.quiet)
+    except ExportError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        store.close()
+
+    if args.output != '-':
+        print(f"✓ Exported {count} readings to {args.output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
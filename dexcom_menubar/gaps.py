@@ -0,0 +1,129 @@
+"""Detect missing readings in the stored history and plan backfill requests"""
+
+import math
+import logging
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Any, Tuple
+
+from dexcom_menubar.storage import ReadingStore, to_ms
+
+logger = logging.getLogger(__name__)
+
+# CGM readings arrive every 5 minutes
+READING_INTERVAL_MS = 5 * 60 * 1000
+
+# Dexcom Share only serves the last 24 hours
+MAX_BACKFILL_MINUTES = 1440
+MAX_BACKFILL_COUNT = MAX_BACKFILL_MINUTES // 5
+
+# Readings covered by the regular fetch (max_count=12)
+REGULAR_FETCH_COUNT = 12
+
+
+def find_gaps(timestamps: List[int], start_ms: int, end_ms: int) -> List[Tuple[int, int]]:
+    """
+    Find missing 5-minute slots between start and end
+
+    The end of the range is treated as the time the next reading is due, so
+    a reading that simply hasn't arrived yet is not counted as missing.
+
+    Args:
+        timestamps: Sorted reading timestamps (ms) within the range
+        start_ms: Start of the range (ms)
+        end_ms: End of the range, normally now (ms)
+
+    Returns:
+        List of (first_missing_slot_ms, missing_count) tuples, oldest first
+    """
+    gaps = []
+
+    # Missing readings before the first stored one
+    first = timestamps[0] if timestamps else end_ms
+    leading = (first - start_ms) // READING_INTERVAL_MS
+    if leading > 0:
+        gaps.append((first - leading * READING_INTERVAL_MS, leading))
+
+    # Missing readings between (and after) stored ones
+    for previous, current in zip(timestamps, timestamps[1:] + [end_ms]):
+        missing = round((current - previous) / READING_INTERVAL_MS) - 1
+        if missing > 0:
+            gaps.append((previous + READING_INTERVAL_MS, missing))
+
+    return gaps
+
+
+class GapDetector:
+    """
+    Measure completeness of the stored history and size backfill requests
+
+    Holes that a backfill has already asked Share for are not requested
+    again (Share has nothing for them), but still count towards the stats.
+    """
+
+    def __init__(self, store: ReadingStore, window: timedelta = timedelta(minutes=MAX_BACKFILL_MINUTES)):
+        """
+        Args:
+            store: Reading store to inspect
+            window: How far back to look for gaps (at most 24 hours is recoverable)
+        """
+        self.store = store
+        self.window = window
+        self.checked_until_ms: Optional[int] = None
+
+    def stats(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Compute gap statistics over the detection window
+
+        Returns:
+            Dictionary with expected, present and missing reading counts,
+            completeness (0-1) and the longest gap in minutes
+        """
+        now = now or datetime.now()
+        start = now - self.window
+        timestamps = self.store.timestamps(start, now)
+        gaps = find_gaps(timestamps, to_ms(start), to_ms(now))
+
+        missing = sum(count for _, count in gaps)
+        present = len(timestamps)
+        expected = present + missing
+        longest = max((count for _, count in gaps), default=0)
+
+        return {
+            'expected': expected,
+            'present': present,
+            'missing': missing,
+            'gaps': len(gaps),
+            'completeness': present / expected if expected else 1.0,
+            'longest_gap_minutes': longest * READING_INTERVAL_MS // 60000
+        }
+
+    def plan_backfill(self, now: Optional[datetime] = None) -> Optional[Tuple[int, int]]:
+        """
+        Size a single request covering every recoverable missing slot
+
+        Returns:
+            (minutes, max_count) for get_glucose_readings, or None if the
+            regular fetch already covers everything that is missing
+        """
+        now = now or datetime.now()
+        now_ms = to_ms(now)
+        start_ms = to_ms(now - self.window)
+        if self.checked_until_ms is not None:
+            start_ms = max(start_ms, self.checked_until_ms)
+
+        start = datetime.fromtimestamp(start_ms / 1000)
+        gaps = find_gaps(self.store.timestamps(start, now), start_ms, now_ms)
+        if not gaps:
+            return None
+
+        oldest_missing_ms = gaps[0][0]
+        if now_ms - oldest_missing_ms <= REGULAR_FETCH_COUNT * READING_INTERVAL_MS:
+            return None
+
+        minutes = min(MAX_BACKFILL_MINUTES, math.ceil((now_ms - oldest_missing_ms) / 60000) + 5)
+        max_count = min(MAX_BACKFILL_COUNT, minutes // 5 + 1)
+        return minutes, max_count
+
+    def mark_backfilled(self, now: Optional[datetime] = None):
+        """Record that everything up to now has been requested from Share"""
+        self.checked_until_ms = to_ms(now or datetime.now())
@@ -0,0 +1,248 @@
+"""Nightscout uploader with a durable on-disk outbox"""
+
+import os
+import gzip
+import time
+import sqlite3
+import hashlib
+import logging
+from datetime import datetime, timezone
+from typing import Optional, List, Dict, Any, Iterable
+
+import requests
+
+from dexcom_menubar.storage import APP_SUPPORT_DIR, to_ms
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUTBOX_PATH = os.path.join(APP_SUPPORT_DIR, "nightscout_outbox.db")
+DEFAULT_BATCH_SIZE = 500
+
+# Sent readings are remembered this long to drop re-fetched duplicates;
+# Share never returns anything older
+SENT_RETENTION_MS = 24 * 60 * 60 * 1000
+
+# Nightscout direction names for Dexcom trend values
+DIRECTIONS = {
+    0: 'NONE',
+    1: 'DoubleUp',
+    2: 'SingleUp',
+    3: 'FortyFiveUp',
+    4: 'Flat',
+    5: 'FortyFiveDown',
+    6: 'SingleDown',
+    7: 'DoubleDown',
+    8: 'NOT COMPUTABLE',
+    9: 'RATE OUT OF RANGE'
+}
+
+
+class NightscoutUploader:
+    """
+    Mirror readings into a Nightscout-compatible backend
+
+    New readings are written to a SQLite outbox keyed by timestamp and sent
+    as gzip-compressed batches over a keep-alive session. Readings are only
+    marked as sent once the server has accepted them, so anything queued
+    while offline is drained in large batches on the next successful flush.
+    Sent readings stay in the outbox for 24 hours, so re-fetching them
+    (every cycle overlaps the previous one, and restarts start from scratch)
+    doesn't upload them again.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        api_secret: Optional[str] = None,
+        outbox_path: str = DEFAULT_OUTBOX_PATH,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        timeout: float = 10.0,
+        max_backoff: float = 1800.0
+    ):
+        """
+        Initialize the uploader
+
+        Args:
+            url: Nightscout base URL (e.g. https://example.herokuapp.com)
+            api_secret: Nightscout API secret (sent SHA1-hashed)
+            outbox_path: Path to the SQLite outbox database
+            batch_size: Maximum number of readings per POST
+            timeout: Request timeout in seconds
+            max_backoff: Longest wait in seconds between retries after failures
+        """
+        self.entries_url = f"{url.rstrip('/')}/api/v1/entries"
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+        self.failures = 0
+        self.retry_at = 0.0
+
+        # A single session reuses the connection between batches and cycles
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Content-Type": "application/json",
+            "Content-Encoding": "gzip",
+            "Accept": "application/json",
+            "User-Agent": "dexcom-menubar"
+        })
+        if api_secret:
+            self.session.headers["api-secret"] = hashlib.sha1(api_secret.encode('utf-8')).hexdigest()
+
+        directory = os.path.dirname(outbox_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.conn = sqlite3.connect(outbox_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            "date INTEGER PRIMARY KEY, "
+            "entry TEXT NOT NULL, "
+            "sent INTEGER NOT NULL DEFAULT 0)"
+        )
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(outbox)")]
+        if "sent" not in columns:
+            self.conn.execute("ALTER TABLE outbox ADD COLUMN sent INTEGER NOT NULL DEFAULT 0")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS outbox_unsent ON outbox (sent, date)")
+        self.conn.commit()
+
+    @classmethod
+    def from_env(cls, outbox_path: str = DEFAULT_OUTBOX_PATH) -> Optional['NightscoutUploader']:
+        """
+        Create an uploader from environment variables
+
+        NIGHTSCOUT_URL enables uploading; NIGHTSCOUT_API_SECRET and
+        NIGHTSCOUT_BATCH_SIZE are optional.
+
+        Args:
+            outbox_path: Path to the SQLite outbox database
+
+        Returns:
+            Uploader, or None if NIGHTSCOUT_URL is not set
+        """
+        url = os.environ.get('NIGHTSCOUT_URL')
+        if not url:
+            return None
+
+        value = os.environ.get('NIGHTSCOUT_BATCH_SIZE')
+        batch_size = DEFAULT_BATCH_SIZE
+        if value:
+            try:
+                batch_size = int(value)
+            except ValueError:
+                batch_size = 0
+            if batch_size < 1:
+                logger.warning(f"Invalid NIGHTSCOUT_BATCH_SIZE '{value}', using {DEFAULT_BATCH_SIZE}")
+                batch_size = DEFAULT_BATCH_SIZE
+
+        return cls(url, os.environ.get('NIGHTSCOUT_API_SECRET'), outbox_path=outbox_path, batch_size=batch_size)
+
+    @staticmethod
+    def _format_entry(reading: Dict[str, Any]) -> str:
+        """Serialize a parsed reading as a Nightscout SGV entry"""
+        date = reading.get('timestamp_ms') or to_ms(reading['timestamp'])
+        date_string = datetime.fromtimestamp(date / 1000, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+        direction = DIRECTIONS.get(reading['trend'], 'NONE')
+        return (
+            f'{{"type": "sgv", "sgv": {int(reading["value"])}, "direction": "{direction}", '
+            f'"date": {date}, "dateString": "{date_string}", "device": "dexcom-menubar"}}'
+        )
+
+    def enqueue(self, readings: Iterable[Dict[str, Any]]) -> int:
+        """
+        Add readings to the outbox, ignoring ones already queued or sent
+
+        Returns:
+            Number of newly queued readings
+        """
+        rows = [
+            (reading.get('timestamp_ms') or to_ms(reading['timestamp']), self._format_entry(reading))
+            for reading in readings
+        ]
+        if not rows:
+            return 0
+
+        before = self.conn.total_changes
+        with self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO outbox (date, entry) VALUES (?, ?)", rows)
+        return self.conn.total_changes - before
+
+    def pending(self) -> int:
+        """Number of readings waiting to be uploaded"""
+        return self.conn.execute("SELECT COUNT(*) FROM outbox WHERE sent = 0").fetchone()[0]
+
+    def _next_batch(self) -> List[tuple]:
+        """Oldest queued readings, up to one batch"""
+        return self.conn.execute(
+            "SELECT date, entry FROM outbox WHERE sent = 0 ORDER BY date LIMIT ?",
+            (self.batch_size,)
+        ).fetchall()
+
+    def _post(self, entries: List[str]) -> bool:
+        """Send one batch of serialized entries"""
+        body = gzip.compress(f"[{','.join(entries)}]".encode('utf-8'))
+
+        try:
+            response = self.session.post(self.entries_url, data=body, timeout=self.timeout)
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Nightscout upload failed: {e}")
+            return False
+
+        if response.status_code != 200:
+            logger.warning(f"Nightscout upload failed: {response.status_code} - {response.text[:200]}")
+            return False
+
+        return True
+
+    def flush(self) -> int:
+        """
+        Upload queued readings in batches until the outbox is empty
+
+        Stops at the first failed batch and backs off exponentially before
+        trying again, so a slow or unreachable server doesn't stall every
+        update cycle.
+
+        Returns:
+            Number of readings uploaded
+        """
+        if time.monotonic() < self.retry_at:
+            return 0
+
+        uploaded = 0
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                break
+
+            if not self._post([entry for _, entry in batch]):
+                self.failures += 1
+                delay = min(self.max_backoff, 30.0 * 2 ** (self.failures - 1))
+                self.retry_at = time.monotonic() + delay
+                logger.info(f"Retrying Nightscout upload in {delay:.0f}s ({self.pending()} pending)")
+                break
+
+            # Batches are taken oldest first, so everything unsent up to the last date was sent
+            with self.conn:
+                self.conn.execute("UPDATE outbox SET sent = 1 WHERE sent = 0 AND date <= ?", (batch[-1][0],))
+            uploaded += len(batch)
+            self.failures = 0
+            self.retry_at = 0.0
+
+            if len(batch) < self.batch_size:
+                break
+
+        if uploaded:
+            logger.info(f"Uploaded {uploaded} readings to Nightscout")
+            self._prune_sent()
+        return uploaded
+
+    def _prune_sent(self):
+        """Forget sent readings too old to be fetched from Share again"""
+        cutoff = int(time.time() * 1000) - SENT_RETENTION_MS
+        with self.conn:
+            self.conn.execute("DELETE FROM outbox WHERE sent = 1 AND date < ?", (cutoff,))
+
+    def close(self):
+        """Close the HTTP session and outbox database"""
+        self.session.close()
+        self.conn.close()
@@ -0,0 +1,312 @@
+"""Staged processing of glucose readings for each update cycle"""
+
+import time
+import logging
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Any, Callable, Set
+
+from dexcom_menubar.dexcom_api import DexcomShareAPI
+from dexcom_menubar.storage import ReadingStore, from_ms
+from dexcom_menubar.nightscout import NightscoutUploader
+from dexcom_menubar.gaps import GapDetector, MAX_BACKFILL_COUNT
+
+logger = logging.getLogger(__name__)
+
+# Number of readings shown in the recent readings window
+WINDOW_SIZE = 12
+
+
+class Cycle:
+    """State passed through the pipeline during one update cycle"""
+
+    def __init__(self):
+        self.raw: List[Dict[str, Any]] = []           # Raw Share entries
+        self.readings: List[Dict[str, Any]] = []      # Parsed readings, newest first
+        self.new: List[Dict[str, Any]] = []           # Readings not seen before, newest first
+        self.window: List[Dict[str, Any]] = []        # Most recent readings, newest first
+        self.gap_stats: Optional[Dict[str, Any]] = None
+        self.stopped_at: Optional[str] = None         # Stage that reported no change
+
+    @property
+    def latest(self) -> Optional[Dict[str, Any]]:
+        """Most recent reading in the window"""
+        return self.window[0] if self.window else None
+
+
+class Stage(ABC):
+    """
+    A single step of the reading pipeline
+
+    Subclasses implement process(), returning False to signal "no change"
+    so that later stages are skipped for this cycle.
+    """
+
+    name = "stage"
+
+    @abstractmethod
+    def process(self, cycle: Cycle) -> bool:
+        """Process the cycle, returning False if later stages should be skipped"""
+
+
+class Pipeline:
+    """Run stages in order until one reports no change"""
+
+    def __init__(self, stages: List[Stage]):
+        self.stages = stages
+
+    def run(self) -> Cycle:
+        """
+        Run one update cycle
+
+        Returns:
+            The cycle state after the last stage that ran
+        """
+        cycle = Cycle()
+        for stage in self.stages:
+            started = time.perf_counter()
+            changed = stage.process(cycle)
+            logger.debug(f"Stage {stage.name}: {(time.perf_counter() - started) * 1000:.1f} ms")
+            if not changed:
+                cycle.stopped_at = stage.name
+                logger.debug(f"Stage {stage.name} reported no change, skipping later stages")
+                break
+        return cycle
+
+
+class FlushStage(Stage):
+    """Retry Nightscout uploads left queued by earlier cycles"""
+
+    name = "flush"
+
+    def __init__(self, uploader: NightscoutUploader):
+        self.uploader = uploader
+
+    def process(self, cycle: Cycle) -> bool:
+        # Runs before the fetch so the outbox drains even when nothing new arrives
+        try:
+            self.uploader.flush()
+        except Exception as e:
+            logger.error(f"Failed to upload readings to Nightscout: {e}")
+        return True
+
+
+class FetchStage(Stage):
+    """Fetch raw readings, sized to also backfill gaps in the stored history"""
+
+    name = "fetch"
+
+    def __init__(self, api: DexcomShareAPI, gap_detector: GapDetector):
+        self.api = api
+        self.gap_detector = gap_detector
+
+    def process(self, cycle: Cycle) -> bool:
+        plan = self.gap_detector.plan_backfill()
+        if not plan:
+            cycle.raw = self.api.get_raw_glucose_readings(max_count=WINDOW_SIZE)
+        else:
+            minutes, max_count = plan
+            logger.info(f"Backfilling history: last {minutes} minutes (up to {max_count} readings)")
+            cycle.raw = self.api.get_raw_glucose_readings(max_count=max_count, minutes=minutes)
+            self.gap_detector.mark_backfilled()
+
+        if not cycle.raw:
+            logger.warning("No glucose reading available")
+        return bool(cycle.raw)
+
+
+class ParseStage(Stage):
+    """Parse raw Share entries into reading dictionaries"""
+
+    name = "parse"
+
+    def __init__(self, api: DexcomShareAPI):
+        self.api = api
+
+    def process(self, cycle: Cycle) -> bool:
+        cycle.readings = sorted(
+            (self.api.parse_reading(raw) for raw in cycle.raw),
+            key=lambda reading: reading['timestamp_ms'],
+            reverse=True
+        )
+        return bool(cycle.readings)
+
+
+class UploadStage(Stage):
+    """Queue every fetched reading for Nightscout and upload anything new"""
+
+    name = "upload"
+
+    def __init__(self, uploader: NightscoutUploader, store: Optional[ReadingStore] = None):
+        """
+        Initialize the stage
+
+        Args:
+            uploader: Nightscout uploader
+            store: Reading history queued once on the first cycle, so readings
+                stored without reaching the outbox (or before uploading was
+                enabled) are still sent
+        """
+        self.uploader = uploader
+        self.store = store
+
+    def _queue_history(self):
+        """Queue the last 24 hours of stored readings"""
+        start = datetime.now() - timedelta(days=1)
+        for rows in self.store.iter_batches(start=start):
+            self.uploader.enqueue(
+                {'timestamp_ms': timestamp_ms, 'timestamp': from_ms(timestamp_ms), 'value': value, 'trend': trend}
+                for timestamp_ms, value, trend in rows
+            )
+
+    def process(self, cycle: Cycle) -> bool:
+        # Runs before dedupe on every fetched reading; the outbox ignores ones
+        # already queued or sent, so a failed enqueue is retried next cycle
+        try:
+            if self.store:
+                self._queue_history()
+                self.store = None
+            if self.uploader.enqueue(cycle.readings):
+                self.uploader.flush()
+        except Exception as e:
+            logger.error(f"Failed to upload readings to Nightscout: {e}")
+        return True
+
+
+class DedupeStage(Stage):
+    """Pass on only readings that haven't been seen, and keep the recent window"""
+
+    name = "dedupe"
+
+    def __init__(self, store: Optional[ReadingStore] = None, max_seen: int = MAX_BACKFILL_COUNT):
+        """
+        Initialize the stage
+
+        Args:
+            store: Reading history used to seed the seen timestamps, so a
+                restart doesn't treat the whole fetch as new
+            max_seen: Number of timestamps to remember
+        """
+        self.max_seen = max_seen
+        self.seen: Set[int] = set()
+        self.window: List[Dict[str, Any]] = []
+
+        if store:
+            try:
+                self.seen.update(store.timestamps(start=datetime.now() - timedelta(days=1)))
+            except Exception as e:
+                logger.error(f"Failed to load stored reading timestamps: {e}")
+            self._prune()
+
+    def _prune(self):
+        """Only the last 24 hours can come back from Share, forget anything older"""
+        if len(self.seen) > self.max_seen:
+            self.seen.difference_update(sorted(self.seen)[:len(self.seen) - self.max_seen])
+
+    def process(self, cycle: Cycle) -> bool:
+        cycle.new = [reading for reading in cycle.readings if reading['timestamp_ms'] not in self.seen]
+        if cycle.new:
+            self.seen.update(reading['timestamp_ms'] for reading in cycle.new)
+            self._prune()
+
+        # Stored readings aren't new, but the first fetch after a restart still fills the window
+        recent = {reading['timestamp_ms']: reading for reading in self.window}
+        recent.update((reading['timestamp_ms'], reading) for reading in cycle.readings)
+        window = [recent[timestamp_ms] for timestamp_ms in sorted(recent, reverse=True)[:WINDOW_SIZE]]
+        window_changed = [r['timestamp_ms'] for r in window] != [r['timestamp_ms'] for r in self.window]
+
+        self.window = window
+        cycle.window = window
+        return bool(cycle.new) or window_changed
+
+
+class PersistStage(Stage):
+    """Store new readings locally"""
+
+    name = "persist"
+
+    def __init__(self, store: ReadingStore):
+        self.store = store
+
+    def process(self, cycle: Cycle) -> bool:
+        try:
+            added = self.store.add_readings(cycle.new)
+            if added:
+                logger.info(f"Stored {added} new readings")
+        except Exception as e:
+            logger.error(f"Failed to store readings: {e}")
+        return True
+
+
+class AnalyticsStage(Stage):
+    """Measure how complete the last 24 hours of stored history is"""
+
+    name = "analytics"
+
+    def __init__(self, gap_detector: GapDetector):
+        self.gap_detector = gap_detector
+
+    def process(self, cycle: Cycle) -> bool:
+        try:
+            stats = self.gap_detector.stats()
+        except Exception as e:
+            logger.error(f"Failed to compute gap statistics: {e}")
+            return True
+
+        cycle.gap_stats = stats
+        logger.info(
+            f"History completeness (24h): {stats['completeness']:.1%} "
+            f"({stats['missing']} missing in {stats['gaps']} gaps, "
+            f"longest {stats['longest_gap_minutes']} min)"
+        )
+        return True
+
+
+class CallbackStage(Stage):
+    """Hand the cycle to a callback (e.g. alerts or UI updates)"""
+
+    def __init__(self, name: str, callback: Callable[[Cycle], Any]):
+        self.name = name
+        self.callback = callback
+
+    def process(self, cycle: Cycle) -> bool:
+        self.callback(cycle)
+        return True
+
+
+def build_pipeline(
+    api: DexcomShareAPI,
+    store: ReadingStore,
+    gap_detector: GapDetector,
+    uploader: Optional[NightscoutUploader],
+    alert: Callable[[Cycle], Any],
+    render: Callable[[Cycle], Any]
+) -> Pipeline:
+    """
+    Build the standard pipeline: (flush →) fetch → parse (→ upload) → dedupe →
+    persist → analytics → alert → render, with flush and upload only when
+    Nightscout is configured
+
+    Args:
+        api: Dexcom Share client
+        store: Local reading history
+        gap_detector: Gap detector over the reading history
+        uploader: Nightscout uploader, if configured
+        alert: Called with the cycle when new readings arrived
+        render: Called with the cycle to update the UI
+
+    Returns:
+        Pipeline ready to run once per update cycle
+    """
+    stages: List[Stage] = [FlushStage(uploader)] if uploader else []
+    stages += [FetchStage(api, gap_detector), ParseStage(api)]
+    if uploader:
+        stages.append(UploadStage(uploader, store))
+    stages += [
+        DedupeStage(store),
+        PersistStage(store),
+        AnalyticsStage(gap_detector),
+        CallbackStage("alert", alert),
+        CallbackStage("render", render),
+    ]
+    return Pipeline(stages)
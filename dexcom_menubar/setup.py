@@ -1,22 +1,64 @@
 """Interactive setup script for Dexcom Menubar credentials"""
 
 import sys
+import time
+import argparse
 import getpass
 from dexcom_menubar.credentials import CredentialManager
-from dexcom_menubar.dexcom_api import DexcomShareAPI, DexcomAuthenticationError, DexcomAPIError
+from dexcom_menubar.dexcom_api import DexcomShareAPI, DexcomAuthenticationError, DexcomAPIError, NULL_ACCOUNT_ID
+
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Manage Dexcom Menubar credential profiles")
+    parser.add_argument("--profile", help="Profile to create or update (default: active profile)")
+    parser.add_argument("--list", action="store_true", help="List saved profiles and exit")
+    parser.add_argument("--delete", metavar="PROFILE", help="Delete a saved profile and exit")
+    return parser.parse_args()
+
+
+def list_profiles():
+    """Print saved profiles, marking the active one"""
+    profiles = CredentialManager.list_profiles()
+    active = CredentialManager.get_active_profile()
+
+    if not profiles:
+        print("No saved profiles.")
+        return
+
+    print("Saved profiles:")
+    for name in profiles:
+        marker = "*" if name == active else " "
+        print(f"  {marker} {name}")
+    print("\nSelect a profile with the DEXCOM_PROFILE environment variable.")
 
 
 def main():
     """Interactive credential setup"""
+    args = parse_args()
+
+    if args.list:
+        list_profiles()
+        sys.exit(0)
+
+    if args.delete:
+        if CredentialManager.delete_credentials(args.delete):
+            print(f"✓ Profile '{args.delete}' deleted.")
+            sys.exit(0)
+        print(f"✗ Failed to delete profile '{args.delete}'.")
+        sys.exit(1)
+
+    profile = args.profile or CredentialManager.get_active_profile()
+
     print("\n" + "=" * 60)
     print("Dexcom Menubar - Credential Setup")
     print("=" * 60 + "\n")
 
     print("This will securely store your Dexcom Share credentials")
-    print("in the macOS Keychain.\n")
+    print(f"in the macOS Keychain (profile '{profile}').\n")
 
     # Check if credentials already exist
-    if CredentialManager.has_credentials():
+    if CredentialManager.load_profile(profile):
         response = input("Credentials already exist. Overwrite? (y/N): ").strip().lower()
         if response != 'y':
             print("\nSetup cancelled.")
@@ -37,25 +79,31 @@ def main():
 
     # Get region
     print("\nSelect your region:")
+    print("  0) Detect automatically")
     print("  1) US (United States)")
     print("  2) OUS (Outside US)")
-    region_choice = input("Enter choice (1 or 2) [1]: ").strip() or "1"
+    region_choice = input("Enter choice (0, 1 or 2) [0]: ").strip() or "0"
 
-    if region_choice == "1":
+    if region_choice == "0":
+        region = None
+    elif region_choice == "1":
         region = "US"
     elif region_choice == "2":
         region = "OUS"
     else:
-        print("\nError: Invalid choice. Using US.")
-        region = "US"
+        print("\nError: Invalid choice. Detecting automatically.")
+        region = None
 
-    print(f"\nRegion selected: {region}")
+    print(f"\nRegion selected: {region or 'auto-detect'}")
 
     # Test credentials
     print("\nTesting credentials...")
+    api = DexcomShareAPI(username, password, region)
     try:
-        api = DexcomShareAPI(username, password, region)
+        started = time.monotonic()
         api.authenticate()
+        if not region:
+            print(f"✓ Detected region: {api.region} ({time.monotonic() - started:.1f}s)")
         print("✓ Authentication successful!")
 
         # Try to get a reading
@@ -67,10 +115,16 @@ def main():
 
     except DexcomAuthenticationError as e:
         print(f"\n✗ Authentication failed: {e}")
+        # Detection can succeed before the login itself fails
+        if not region and api.region:
+            print(f"Detected region {api.region}, but logging in failed.")
+        elif not region:
+            print("Neither the US nor the OUS server accepted these credentials.")
         print("\nPlease verify:")
         print("  - Your username and password are correct")
         print("  - Share is enabled in the Dexcom app")
-        print("  - You selected the correct region")
+        if region:
+            print("  - You selected the correct region")
         response = input("\nSave credentials anyway? (y/N): ").strip().lower()
         if response != 'y':
             print("\nSetup cancelled.")
@@ -89,11 +143,17 @@ def main():
             print("\nSetup cancelled.")
             sys.exit(1)
 
+    # Keep whatever was detected, even if a later step failed
+    region = api.region
+    account_id = api.account_id if api.account_id != NULL_ACCOUNT_ID else None
+
     # Save credentials
     print("\nSaving credentials to macOS Keychain...")
-    if CredentialManager.save_credentials(username, password, region):
+    if CredentialManager.save_credentials(username, password, region, profile=profile, account_id=account_id):
         print("✓ Credentials saved successfully!\n")
         print("You can now run the menubar app:")
+        if profile != CredentialManager.get_active_profile():
+            print(f"  export DEXCOM_PROFILE={profile}")
         print("  ./run.sh")
         print("  or")
         print("  python -m dexcom_menubar.app\n")
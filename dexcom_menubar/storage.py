@@ -0,0 +1,147 @@
+"""Local storage for glucose reading history"""
+
+import os
+import sqlite3
+import logging
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Iterator, Iterable, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Same directory rumps.application_support('DexcomMenubar') returns
+APP_SUPPORT_DIR = os.path.join(os.path.expanduser("~"), "Library", "Application Support", "DexcomMenubar")
+DEFAULT_DB_PATH = os.path.join(APP_SUPPORT_DIR, "readings.db")
+
+
+def to_ms(timestamp: datetime) -> int:
+    """Convert a (local, naive) datetime to milliseconds since epoch"""
+    return int(round(timestamp.timestamp() * 1000))
+
+
+def from_ms(timestamp_ms: int) -> datetime:
+    """Convert milliseconds since epoch to a local, naive datetime"""
+    return datetime.fromtimestamp(timestamp_ms / 1000)
+
+
+class ReadingStore:
+    """
+    SQLite-backed history of glucose readings
+
+    Readings are keyed by their Dexcom timestamp (milliseconds since epoch),
+    so adding the same reading twice is a no-op.
+    """
+
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        """
+        Open (and create if needed) the reading database
+
+        Args:
+            path: Path to the SQLite database file
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS readings ("
+            "timestamp INTEGER PRIMARY KEY, "
+            "value INTEGER NOT NULL, "
+            "trend INTEGER NOT NULL)"
+        )
+        self.conn.commit()
+
+    def add_readings(self, readings: Iterable[Dict[str, Any]]) -> int:
+        """
+        Store parsed readings, ignoring ones that are already stored
+
+        Args:
+            readings: Reading dictionaries as returned by DexcomShareAPI
+
+        Returns:
+            Number of newly stored readings
+        """
+        rows = [
+            (reading.get('timestamp_ms') or to_ms(reading['timestamp']), reading['value'], reading['trend'])
+            for reading in readings
+        ]
+        if not rows:
+            return 0
+
+        before = self.conn.total_changes
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO readings (timestamp, value, trend) VALUES (?, ?, ?)",
+                rows
+            )
+        return self.conn.total_changes - before
+
+    @staticmethod
+    def _range_clause(start: Optional[datetime], end: Optional[datetime]) -> Tuple[str, List[int]]:
+        """Build a WHERE clause for an optional [start, end) time range"""
+        conditions = []
+        params = []
+        if start is not None:
+            conditions.append("timestamp >= ?")
+            params.append(to_ms(start))
+        if end is not None:
+            conditions.append("timestamp < ?")
+            params.append(to_ms(end))
+
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        return where, params
+
+    def count(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> int:
+        """Count stored readings in an optional time range"""
+        where, params = self._range_clause(start, end)
+        return self.conn.execute(f"SELECT COUNT(*) FROM readings{where}", params).fetchone()[0]
+
+    def latest_timestamp(self) -> Optional[datetime]:
+        """Get the timestamp of the most recent stored reading"""
+        row = self.conn.execute("SELECT MAX(timestamp) FROM readings").fetchone()
+        return from_ms(row[0]) if row and row[0] is not None else None
+
+    def timestamps(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[int]:
+        """Get stored reading timestamps (milliseconds since epoch) in chronological order"""
+        where, params = self._range_clause(start, end)
+        rows = self.conn.execute(f"SELECT timestamp FROM readings{where} ORDER BY timestamp", params)
+        return [row[0] for row in rows]
+
+    def iter_batches(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        batch_size: int = 5000
+    ) -> Iterator[List[Tuple[int, int, int]]]:
+        """
+        Stream stored readings in chronological batches
+
+        Only one batch is held in memory at a time.
+
+        Args:
+            start: Earliest timestamp to include (inclusive)
+            end: Latest timestamp to include (exclusive)
+            batch_size: Number of rows per batch
+
+        Yields:
+            Lists of (timestamp_ms, value, trend) tuples
+        """
+        where, params = self._range_clause(start, end)
+        cursor = self.conn.execute(
+            f"SELECT timestamp, value, trend FROM readings{where} ORDER BY timestamp",
+            params
+        )
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cursor.close()
+
+    def close(self):
+        """Close the database connection"""
+        self.conn.close()
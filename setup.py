@@ -12,10 +12,14 @@ setup(
         "keyring>=24.3.0",
         "python-dateutil>=2.8.2",
     ],
+    extras_require={
+        "parquet": ["pyarrow>=10.0.0"],
+    },
     entry_points={
         "console_scripts": [
             "dexcom-menubar=dexcom_menubar.app:main",
             "dexcom-setup=dexcom_menubar.setup:main",
+            "dexcom-export=dexcom_menubar.export:main",
         ],
     },
     python_requires=">=3.8",
@@ -0,0 +1,110 @@
+"""Tests for Share region detection against local stand-in servers"""
+
+import json
+import threading
+import time
+import unittest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from unittest import mock
+
+from dexcom_menubar.dexcom_api import DexcomShareAPI, DexcomAPIError, DexcomAuthenticationError
+
+ACCOUNT_ID = "11111111-2222-3333-4444-555555555555"
+REJECTED = (500, {"Code": "AccountPasswordInvalid", "Message": "Invalid password"})
+
+
+class StandInShare(BaseHTTPRequestHandler):
+    """Answers AuthenticatePublisherAccount with server.answer after server.delay seconds"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def handle(self):
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped waiting for this response
+            pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        time.sleep(self.server.delay)
+
+        status, body = self.server.answer
+        out = json.dumps(body).encode('utf-8') if not isinstance(body, bytes) else body
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+
+class DetectRegionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.servers = {}
+        for region in DexcomShareAPI.URLS:
+            server = ThreadingHTTPServer(('127.0.0.1', 0), StandInShare)
+            server.daemon_threads = True
+            server.answer = REJECTED
+            server.delay = 0
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            self.servers[region] = server
+
+        urls = {region: f"http://127.0.0.1:{server.server_port}" for region, server in self.servers.items()}
+        patcher = mock.patch.dict(DexcomShareAPI.URLS, urls)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        for server in self.servers.values():
+            server.shutdown()
+            server.server_close()
+
+    def test_detects_region_with_account(self):
+        self.servers['OUS'].answer = (200, ACCOUNT_ID)
+        self.assertEqual(DexcomShareAPI.detect_region('user', 'password'), ('OUS', ACCOUNT_ID))
+
+    def test_slow_region_does_not_delay_detection(self):
+        self.servers['OUS'].answer = (200, ACCOUNT_ID)
+        self.servers['US'].delay = 2
+
+        started = time.monotonic()
+        DexcomShareAPI.detect_region('user', 'password')
+        self.assertLess(time.monotonic() - started, 1)
+
+        # The abandoned probe must not keep the interpreter alive
+        probes = [thread for thread in threading.enumerate() if thread.name.startswith('region-probe-')]
+        self.assertTrue(all(thread.daemon for thread in probes))
+
+    def test_rejected_by_all_regions(self):
+        with self.assertRaises(DexcomAuthenticationError):
+            DexcomShareAPI.detect_region('user', 'password')
+
+    def test_null_account_id_is_a_rejection(self):
+        self.servers['US'].answer = (200, "00000000-0000-0000-0000-000000000000")
+        with self.assertRaises(DexcomAuthenticationError):
+            DexcomShareAPI.detect_region('user', 'password')
+
+    def test_outage_is_not_a_rejection(self):
+        self.servers['OUS'].answer = (503, b"Service Unavailable")
+        with self.assertRaises(DexcomAPIError) as context:
+            DexcomShareAPI.detect_region('user', 'password')
+        self.assertNotIsInstance(context.exception, DexcomAuthenticationError)
+
+    def test_unexpected_error_code_is_not_a_rejection(self):
+        self.servers['OUS'].answer = (500, {"Code": "InternalServerError"})
+        with self.assertRaises(DexcomAPIError) as context:
+            DexcomShareAPI.detect_region('user', 'password')
+        self.assertNotIsInstance(context.exception, DexcomAuthenticationError)
+
+    def test_timeout_is_not_a_rejection(self):
+        self.servers['OUS'].delay = 1
+        with self.assertRaises(DexcomAPIError) as context:
+            DexcomShareAPI.detect_region('user', 'password', timeout=0.3)
+        self.assertNotIsInstance(context.exception, DexcomAuthenticationError)
+
+
+if __name__ == '__main__':
+    unittest.main()
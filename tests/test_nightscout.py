@@ -0,0 +1,209 @@
+"""Tests for the Nightscout uploader against a local stand-in server"""
+
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from unittest import mock
+
+from dexcom_menubar.nightscout import NightscoutUploader, DEFAULT_BATCH_SIZE
+
+ONE_MINUTE_MS = 60 * 1000
+
+# Fixed so repeated fetches return the same timestamps, all within the last 24 hours
+BASE_MS = int(time.time() * 1000) - 1300 * ONE_MINUTE_MS
+
+
+class StandInNightscout(BaseHTTPRequestHandler):
+    """Accepts /api/v1/entries uploads, optionally failing or responding slowly"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def handle(self):
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client timed out before the delayed response
+            pass
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        time.sleep(server.delay)
+
+        if server.fail:
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        entries = json.loads(gzip.decompress(body))
+        server.posts.append([entry['date'] for entry in entries])
+
+        out = b'[]'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+
+def make_readings(start, count):
+    """Readings for one-minute slots start..start+count, newest first like Share returns them"""
+    readings = []
+    for i in range(start, start + count):
+        timestamp_ms = BASE_MS + i * ONE_MINUTE_MS
+        readings.append({
+            'value': 100 + i % 50,
+            'trend': 4,
+            'timestamp': datetime.fromtimestamp(timestamp_ms / 1000),
+            'timestamp_ms': timestamp_ms
+        })
+    return list(reversed(readings))
+
+
+class NightscoutUploaderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StandInNightscout)
+        self.server.daemon_threads = True
+        self.server.fail = False
+        self.server.delay = 0
+        self.server.posts = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.uploader = NightscoutUploader(
+            f'http://127.0.0.1:{self.server.server_port}',
+            'secret',
+            outbox_path=os.path.join(self.directory.name, 'outbox.db'),
+            batch_size=500,
+            timeout=0.2
+        )
+
+    def tearDown(self):
+        self.uploader.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.directory.cleanup()
+
+    def post_sizes(self):
+        return [len(post) for post in self.server.posts]
+
+    def test_dedupes_across_flushes(self):
+        self.uploader.enqueue(make_readings(0, 12))
+        self.assertEqual(self.uploader.flush(), 12)
+
+        # The next fetch overlaps the previous one by 11 readings
+        self.assertEqual(self.uploader.enqueue(make_readings(1, 12)), 1)
+        self.assertEqual(self.uploader.flush(), 1)
+        self.assertEqual(self.post_sizes(), [12, 1])
+
+    def test_dedupes_after_reopening_outbox(self):
+        self.uploader.enqueue(make_readings(0, 12))
+        self.uploader.flush()
+        self.uploader.close()
+
+        self.uploader = NightscoutUploader(
+            f'http://127.0.0.1:{self.server.server_port}',
+            outbox_path=os.path.join(self.directory.name, 'outbox.db')
+        )
+        self.assertEqual(self.uploader.enqueue(make_readings(0, 12)), 0)
+        self.assertEqual(self.uploader.flush(), 0)
+        self.assertEqual(self.post_sizes(), [12])
+
+    def test_failure_keeps_readings_and_backs_off(self):
+        self.server.fail = True
+        self.uploader.enqueue(make_readings(0, 12))
+
+        self.assertEqual(self.uploader.flush(), 0)
+        self.assertEqual(self.uploader.pending(), 12)
+        self.assertGreater(self.uploader.retry_at, time.monotonic())
+
+        # Nothing is attempted until the backoff expires, even once the server recovers
+        self.server.fail = False
+        self.assertEqual(self.uploader.flush(), 0)
+        self.assertEqual(self.server.posts, [])
+
+        self.uploader.retry_at = 0
+        self.assertEqual(self.uploader.flush(), 12)
+        self.assertEqual(self.uploader.pending(), 0)
+
+    def test_backoff_grows_with_consecutive_failures(self):
+        self.server.fail = True
+        self.uploader.enqueue(make_readings(0, 1))
+
+        delays = []
+        for _ in range(3):
+            self.uploader.retry_at = 0
+            self.uploader.flush()
+            delays.append(self.uploader.retry_at - time.monotonic())
+
+        self.assertLess(delays[0], delays[1])
+        self.assertLess(delays[1], delays[2])
+
+    def test_timeout_keeps_readings(self):
+        self.server.delay = 0.5
+        self.uploader.enqueue(make_readings(0, 12))
+
+        self.assertEqual(self.uploader.flush(), 0)
+        self.assertEqual(self.uploader.pending(), 12)
+
+    def test_drains_backlog_in_batches(self):
+        self.server.fail = True
+        for i in range(1288):
+            self.uploader.enqueue(make_readings(i, 1))
+        self.uploader.flush()
+
+        self.server.fail = False
+        self.uploader.retry_at = 0
+        self.assertEqual(self.uploader.flush(), 1288)
+        self.assertEqual(self.post_sizes(), [500, 500, 288])
+        self.assertEqual(self.uploader.pending(), 0)
+
+        # Batches go out oldest first
+        dates = [date for post in self.server.posts for date in post]
+        self.assertEqual(dates, sorted(dates))
+
+
+class FormatEntryTest(unittest.TestCase):
+
+    def test_entry_uses_utc_date_string(self):
+        reading = {'value': 120, 'trend': 4, 'timestamp': None, 'timestamp_ms': 1700000000123}
+        entry = json.loads(NightscoutUploader._format_entry(reading))
+        self.assertEqual(entry['date'], 1700000000123)
+        self.assertEqual(entry['dateString'], '2023-11-14T22:13:20.000Z')
+        self.assertEqual(entry['direction'], 'Flat')
+
+
+class FromEnvTest(unittest.TestCase):
+
+    def uploader_for(self, batch_size):
+        environ = {'NIGHTSCOUT_URL': 'http://127.0.0.1:1', 'NIGHTSCOUT_BATCH_SIZE': batch_size}
+        with tempfile.TemporaryDirectory() as directory, mock.patch.dict(os.environ, environ):
+            uploader = NightscoutUploader.from_env(outbox_path=os.path.join(directory, 'outbox.db'))
+            uploader.close()
+            return uploader
+
+    def test_valid_batch_size(self):
+        self.assertEqual(self.uploader_for('100').batch_size, 100)
+
+    def test_invalid_batch_size_falls_back(self):
+        for value in ('abc', '0', '-5'):
+            with self.assertLogs('dexcom_menubar.nightscout', level='WARNING'):
+                self.assertEqual(self.uploader_for(value).batch_size, DEFAULT_BATCH_SIZE)
+
+    def test_disabled_without_url(self):
+        with mock.patch.dict(os.environ, {}, clear=True):
+            self.assertIsNone(NightscoutUploader.from_env())
+
+
+if __name__ == '__main__':
+    unittest.main()
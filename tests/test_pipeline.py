@@ -0,0 +1,113 @@
+"""Tests for the reading pipeline with a stand-in Share client"""
+
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from dexcom_menubar.dexcom_api import DexcomShareAPI
+from dexcom_menubar.gaps import GapDetector
+from dexcom_menubar.nightscout import NightscoutUploader
+from dexcom_menubar.pipeline import build_pipeline
+from dexcom_menubar.storage import ReadingStore
+
+FIVE_MINUTES_MS = 5 * 60 * 1000
+
+# Aligned to a reading slot and fixed, so repeated fetches return the same timestamps
+NOW_MS = int(time.time() * 1000) // FIVE_MINUTES_MS * FIVE_MINUTES_MS
+
+
+class StandInShare:
+    """Returns the latest readings in Share's raw format, newest first"""
+
+    parse_reading = DexcomShareAPI.parse_reading
+    TREND_ARROWS = DexcomShareAPI.TREND_ARROWS
+    TREND_NAMES = DexcomShareAPI.TREND_NAMES
+
+    def __init__(self):
+        self.latest = 0  # Number of reading slots after NOW_MS
+
+    def get_raw_glucose_readings(self, minutes: int = 1440, max_count: int = 288):
+        return [
+            {'WT': f"Date({NOW_MS + (self.latest - i) * FIVE_MINUTES_MS})", 'Value': 100 + i, 'Trend': 'Flat'}
+            for i in range(min(max_count, 12))
+        ]
+
+
+class PipelineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = ReadingStore(os.path.join(self.directory.name, 'readings.db'))
+        self.api = StandInShare()
+        self.uploader = None
+        self.posted = []
+        self.rendered = []
+
+    def tearDown(self):
+        if self.uploader:
+            self.uploader.close()
+        self.store.close()
+        self.directory.cleanup()
+
+    def enable_uploader(self):
+        self.uploader = NightscoutUploader(
+            'http://127.0.0.1:1',
+            outbox_path=os.path.join(self.directory.name, 'outbox.db')
+        )
+        self.uploader._post = lambda entries: self.posted.extend(entries) or True
+
+    def build(self):
+        return build_pipeline(
+            self.api,
+            self.store,
+            GapDetector(self.store),
+            self.uploader,
+            alert=lambda cycle: None,
+            render=self.rendered.append
+        )
+
+    def test_failed_enqueue_is_uploaded_on_a_later_cycle(self):
+        self.enable_uploader()
+        pipeline = self.build()
+
+        with mock.patch.object(self.uploader, 'enqueue', side_effect=sqlite3.OperationalError('database is locked')):
+            cycle = pipeline.run()
+        self.assertEqual(len(cycle.new), 12)
+        self.assertEqual(self.posted, [])
+
+        # Same readings again: nothing new for the store, but they still reach Nightscout
+        cycle = pipeline.run()
+        self.assertEqual(cycle.new, [])
+        self.assertEqual(len(self.posted), 12)
+        self.assertEqual(self.uploader.pending(), 0)
+
+    def test_stored_history_is_uploaded_once_enabled(self):
+        self.api.latest = -12
+        self.build().run()
+        self.assertEqual(self.store.count(), 12)
+
+        self.enable_uploader()
+        self.api.latest = 0
+        self.build().run()
+        self.assertEqual(len(self.posted), 24)
+
+    def test_restart_renders_without_new_readings(self):
+        self.build().run()
+
+        cycle = self.build().run()
+        self.assertEqual(cycle.new, [])
+        self.assertEqual(len(cycle.window), 12)
+        self.assertEqual(len(self.rendered), 2)
+
+        # An unchanged fetch stops at dedupe and skips rendering
+        pipeline = self.build()
+        pipeline.run()
+        self.assertEqual(pipeline.run().stopped_at, 'dedupe')
+        self.assertEqual(len(self.rendered), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()